@@ -14,9 +14,19 @@ SVG 图片嵌入工具
 
 import os
 import base64
+import html
 import re
 import sys
 import argparse
+from collections import OrderedDict
+
+# 匹配 href="xxx.png" 或 href="xxx.jpg" 等（排除已经是 data: 的）
+IMAGE_HREF_PATTERN = re.compile(r'href="(?!data:)([^"]+\.(png|jpg|jpeg|gif|webp))"')
+
+# data URI 缓存总大小上限（按编码后字节数计，超出时淘汰最久未使用的条目）
+DATA_URI_CACHE_MAX_BYTES = 16 * 1024 * 1024
+_data_uri_cache = OrderedDict()
+_data_uri_cache_bytes = 0
 
 def get_mime_type(filename):
     """根据文件扩展名返回 MIME 类型"""
@@ -40,6 +50,33 @@ def get_file_size_str(size_bytes):
     else:
         return f"{size_bytes / (1024 * 1024):.1f} MB"
 
+def build_data_uri(full_path, mtime_ns, size):
+    """
+    读取图片并生成 Base64 data URI
+    
+    以 (路径, 修改时间, 大小) 为缓存键：同一图片在多个 SVG 中引用时
+    （如 finalize_svg 批量处理共用背景图），只读取和编码一次。
+    缓存总大小不超过 DATA_URI_CACHE_MAX_BYTES，超过上限的单张大图不缓存。
+    """
+    global _data_uri_cache_bytes
+    key = (full_path, mtime_ns, size)
+    data_uri = _data_uri_cache.get(key)
+    if data_uri is not None:
+        _data_uri_cache.move_to_end(key)
+        return data_uri
+    
+    with open(full_path, 'rb') as img_file:
+        b64_data = base64.b64encode(img_file.read()).decode('ascii')
+    data_uri = f"data:{get_mime_type(full_path)};base64,{b64_data}"
+    
+    if len(data_uri) <= DATA_URI_CACHE_MAX_BYTES:
+        _data_uri_cache[key] = data_uri
+        _data_uri_cache_bytes += len(data_uri)
+        while _data_uri_cache_bytes > DATA_URI_CACHE_MAX_BYTES:
+            _, evicted = _data_uri_cache.popitem(last=False)
+            _data_uri_cache_bytes -= len(evicted)
+    return data_uri
+
 def embed_images_in_svg(svg_path, dry_run=False):
     """
     将 SVG 文件中的外部图片转换为 Base64 内嵌
@@ -58,9 +95,6 @@ def embed_images_in_svg(svg_path, dry_run=False):
     
     original_size = len(content.encode('utf-8'))
     
-    # 匹配 href="xxx.png" 或 href="xxx.jpg" 等（排除已经是 data: 的）
-    pattern = r'href="(?!data:)([^"]+\.(png|jpg|jpeg|gif|webp))"'
-    
     images_found = []
     images_embedded = 0
     
@@ -69,7 +103,6 @@ def embed_images_in_svg(svg_path, dry_run=False):
         img_path = match.group(1)
         
         # 解码 XML/HTML 实体（如 &amp; -> &）
-        import html
         img_path_decoded = html.unescape(img_path)
         
         # 处理相对路径
@@ -78,27 +111,26 @@ def embed_images_in_svg(svg_path, dry_run=False):
         else:
             full_path = img_path_decoded
         
-        if not os.path.exists(full_path):
+        try:
+            img_stat = os.stat(full_path)
+        except OSError:
             print(f"  [WARN] Image not found: {img_path}")
             images_found.append((img_path, "NOT FOUND", 0))
             return match.group(0)
         
-        img_size = os.path.getsize(full_path)
+        img_size = img_stat.st_size
         
         if dry_run:
             images_found.append((img_path, "WILL EMBED", img_size))
             return match.group(0)
         
-        with open(full_path, 'rb') as img_file:
-            b64_data = base64.b64encode(img_file.read()).decode('utf-8')
-        
-        mime_type = get_mime_type(img_path)
+        data_uri = build_data_uri(full_path, img_stat.st_mtime_ns, img_size)
         images_embedded += 1
         images_found.append((img_path, "EMBEDDED", img_size))
         
-        return f'href="data:{mime_type};base64,{b64_data}"'
+        return f'href="{data_uri}"'
     
-    new_content = re.sub(pattern, replace_with_base64, content)
+    new_content = IMAGE_HREF_PATTERN.sub(replace_with_base64, content)
     
     new_size = len(new_content.encode('utf-8'))
     
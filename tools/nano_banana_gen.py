@@ -9,6 +9,8 @@ Nano Banana Image Generator (Gemini Nano)
 - 负面提示词支持 (通过 Prompt 工程实现)
 - 自动保存为 PNG 格式
 - 环境变量配置 (安全优先)
+- 批量生成 (JSONL 任务文件，多个请求并发执行)
+- 本地结果缓存 (相同模型/参数/提示词直接复用，不重复调用 API)
 
 依赖:
   pip install google-genai
@@ -16,10 +18,15 @@ Nano Banana Image Generator (Gemini Nano)
 
 import os
 import sys
+import json
+import glob
+import shutil
+import hashlib
+import tempfile
 import argparse
 import mimetypes
-from google import genai
-from google.genai import types
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Predefined configuration presets
 VALID_ASPECT_RATIOS = [
@@ -28,17 +35,113 @@ VALID_ASPECT_RATIOS = [
 ]
 VALID_IMAGE_SIZES = ["1K", "2K", "4K"]
 
+# Fields accepted per line in a batch JSONL file (mirror generate() arguments)
+BATCH_FIELDS = ("prompt", "negative_prompt", "aspect_ratio", "image_size", "output_dir", "filename")
+
+# Content-addressed cache of generated images (override with NANO_BANANA_CACHE_DIR)
+CACHE_DIR = os.path.expanduser(os.environ.get("NANO_BANANA_CACHE_DIR", "~/.cache/nano-banana"))
+
+# Clients keyed by (api_key, base_url), reused across generate() calls
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+# Serializes output lines so concurrent batch jobs never interleave mid-line
+_PRINT_LOCK = threading.Lock()
+
+
+def log(message: str, prefix: str = ""):
+    """输出一整行日志（批量模式下各任务带前缀，多线程输出互不穿插）"""
+    with _PRINT_LOCK:
+        print(f"{prefix}{message}", flush=True)
+
 
 def save_binary_file(file_name: str, data: bytes):
     """保存二进制数据到文件"""
     with open(file_name, "wb") as f:
         f.write(data)
-    print(f"File saved to: {file_name}")
+
+
+def get_cache_key(model: str, aspect_ratio: str, image_size: str, prompt_text: str) -> str:
+    """根据模型、宽高比、尺寸和最终提示词计算缓存键"""
+    raw = f"{model}|{aspect_ratio}|{image_size}|{prompt_text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def find_cached_image(cache_key: str):
+    """查找缓存图片，未命中返回 None"""
+    matches = glob.glob(os.path.join(glob.escape(CACHE_DIR), f"{cache_key}.*"))
+    return matches[0] if matches else None
+
+
+def store_cached_image(cache_key: str, image_path: str):
+    """将生成的图片写入缓存（写入失败不影响生成结果）"""
+    # Copy to a temp file first and rename it into place, so an interrupted copy or
+    # a concurrent reader never sees a partial image under the cache key
+    tmp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        extension = os.path.splitext(image_path)[1]
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=".tmp-", suffix=extension)
+        os.close(fd)
+        shutil.copyfile(image_path, tmp_path)
+        os.replace(tmp_path, os.path.join(CACHE_DIR, f"{cache_key}{extension}"))
+    except OSError as e:
+        log(f"Warning: Failed to write image cache: {e}")
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def build_output_name(prompt: str, filename: str) -> str:
+    """确定输出文件名（不含扩展名，未指定文件名时根据提示词命名）"""
+    if filename:
+        return filename
+    safe_prompt = "".join([c for c in prompt if c.isalnum() or c in (' ', '_')]).rstrip()
+    safe_prompt = safe_prompt.replace(" ", "_").lower()[:30]
+    return safe_prompt or "generated_image"
+
+
+def build_output_path(prompt: str, filename: str, output_dir: str, file_extension: str) -> str:
+    """确定输出文件路径（会创建输出目录）"""
+    file_name_with_ext = f"{build_output_name(prompt, filename)}{file_extension}"
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        return os.path.join(output_dir, file_name_with_ext)
+    return file_name_with_ext
+
+
+def get_client(api_key: str, base_url: str = None):
+    """
+    获取复用的 GenAI 客户端
+    
+    同一配置下的多次调用共享一个客户端及其 HTTP 连接池，
+    避免每张图片都重新建立 TCP/TLS 连接。
+    SDK 在首次真正请求 API 时才导入，命中缓存或查看 --help 时无需加载。
+    """
+    try:
+        from google import genai
+    except ImportError:
+        print("Error: google-genai is not installed. Please run: pip install google-genai")
+        sys.exit(1)
+    
+    key = (api_key, base_url)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client_options = {'api_key': api_key}
+            if base_url:
+                client_options['http_options'] = {'base_url': base_url}
+            client = genai.Client(**client_options)
+            _CLIENTS[key] = client
+    return client
 
 
 def generate(prompt: str, negative_prompt: str = None,
              aspect_ratio: str = "1:1", image_size: str = "4K", 
-             output_dir: str = None, filename: str = None):
+             output_dir: str = None, filename: str = None,
+             use_cache: bool = True, log_prefix: str = ""):
     """
     调用 Gemini API 生成图像
     
@@ -49,33 +152,31 @@ def generate(prompt: str, negative_prompt: str = None,
         image_size: 图片尺寸 (1K, 2K, 4K)
         output_dir: 输出目录 (可选，默认为当前目录)
         filename: 指定输出文件名 (不含扩展名，可选)
+        use_cache: 是否使用本地缓存 (默认开启)
+        log_prefix: 输出日志前缀 (批量模式下用于区分任务)
+    
+    Returns:
+        保存的图片路径，未生成图片时返回 None
     """
     # Load configuration
     api_key = os.environ.get("GEMINI_API_KEY")
     base_url = os.environ.get("GEMINI_BASE_URL")
 
     if not api_key:
-        print("Error: API Key not found. Please set GEMINI_API_KEY environment variable.")
+        log("Error: API Key not found. Please set GEMINI_API_KEY environment variable.", log_prefix)
         sys.exit(1)
 
     # Validate aspect_ratio
     if aspect_ratio not in VALID_ASPECT_RATIOS:
-        print(f"Error: Invalid aspect ratio '{aspect_ratio}'. Valid options: {VALID_ASPECT_RATIOS}")
+        log(f"Error: Invalid aspect ratio '{aspect_ratio}'. Valid options: {VALID_ASPECT_RATIOS}", log_prefix)
         sys.exit(1)
 
     # Validate image_size
     size_upper = str(image_size).upper()
     if size_upper not in VALID_IMAGE_SIZES:
-        print(f"Error: Invalid image size '{image_size}'. Valid options: {VALID_IMAGE_SIZES}")
+        log(f"Error: Invalid image size '{image_size}'. Valid options: {VALID_IMAGE_SIZES}", log_prefix)
         sys.exit(1)
 
-    # Configure client options
-    client_options = {'api_key': api_key}
-    if base_url:
-        client_options['http_options'] = {'base_url': base_url}
-
-    client = genai.Client(**client_options)
-
     base_model = "gemini-3-pro-image-preview"
     model = base_model
 
@@ -105,28 +206,43 @@ def generate(prompt: str, negative_prompt: str = None,
     if negative_prompt:
         final_prompt_text += f"\n\nNegative prompt: {negative_prompt}"
     
-    print(f"Generating image with prompt: '{final_prompt_text}'")
-    print(f"Using Model: {model}")
-    print(f"Configuration: Aspect Ratio={aspect_ratio}, Size={image_size}")
+    # Identical requests return the cached image instead of calling the API again
+    cache_key = get_cache_key(model, aspect_ratio, size_upper, final_prompt_text)
+    if use_cache:
+        cached_path = find_cached_image(cache_key)
+        if cached_path:
+            try:
+                full_path = build_output_path(prompt, filename, output_dir, os.path.splitext(cached_path)[1])
+                shutil.copyfile(cached_path, full_path)
+            except OSError as e:
+                log(f"An error occurred: {e}", log_prefix)
+                return None
+            log(f"Cache hit, file saved to: {full_path}", log_prefix)
+            return full_path
     
-    parts = [types.Part.from_text(text=final_prompt_text)]
+    client = get_client(api_key, base_url)
     
+    log(f"Generating image with prompt: '{final_prompt_text}'", log_prefix)
+    log(f"Using Model: {model}", log_prefix)
+    log(f"Configuration: Aspect Ratio={aspect_ratio}, Size={image_size}", log_prefix)
+    
+    # The SDK accepts plain dicts for contents/config; no need to build typed objects per call
     contents = [
-        types.Content(
-            role="user",
-            parts=parts,
-        ),
+        {
+            "role": "user",
+            "parts": [{"text": final_prompt_text}],
+        },
     ]
     
-    generate_content_config = types.GenerateContentConfig(
-        response_modalities=[
+    generate_content_config = {
+        "response_modalities": [
             "IMAGE",
         ],
-        image_config=types.ImageConfig(
-            aspect_ratio=aspect_ratio,
-            image_size=image_size,
-        ),
-    )
+        "image_config": {
+            "aspect_ratio": aspect_ratio,
+            "image_size": image_size,
+        },
+    }
 
     image_saved = False  # Track if we successfully saved an image
     server_text_response = None  # Capture any text response from server
@@ -165,44 +281,129 @@ def generate(prompt: str, negative_prompt: str = None,
             data_buffer, mime_type = last_image_data
             
             if chunk_count > 1:
-                print(f"Received {chunk_count} image chunks, keeping the final (highest quality) one.")
-            
-            # Determine filename
-            if filename:
-                file_name = filename
-            else:
-                safe_prompt = "".join([c for c in prompt if c.isalnum() or c in (' ', '_')]).rstrip()
-                safe_prompt = safe_prompt.replace(" ", "_").lower()[:30]
-                if not safe_prompt:
-                    safe_prompt = "generated_image"
-                file_name = safe_prompt
+                log(f"Received {chunk_count} image chunks, keeping the final (highest quality) one.", log_prefix)
             
             # Determine file extension from server mime_type
             file_extension = mimetypes.guess_extension(mime_type) or ".png"
             if file_extension in ['.jpe', '.jpeg']:
                 file_extension = '.jpg'
             
-            file_name_with_ext = f"{file_name}{file_extension}"
-            if output_dir:
-                os.makedirs(output_dir, exist_ok=True)
-                full_path = os.path.join(output_dir, file_name_with_ext)
-            else:
-                full_path = file_name_with_ext
+            full_path = build_output_path(prompt, filename, output_dir, file_extension)
             save_binary_file(full_path, data_buffer)
+            log(f"File saved to: {full_path}", log_prefix)
             image_saved = True
+            if use_cache:
+                store_cached_image(cache_key, full_path)
         
         if server_text_response:
-            print(f"Server Response: {server_text_response}")
+            log(f"Server Response: {server_text_response}", log_prefix)
         
         if not image_saved:
-            print("Warning: No image was generated. The server may have refused the request.")
+            log("Warning: No image was generated. The server may have refused the request.", log_prefix)
+            return None
+        
+        return full_path
                 
     except Exception as e:
-        print(f"An error occurred: {e}")
+        log(f"An error occurred: {e}", log_prefix)
+        return None
+
+
+def load_batch_file(batch_file: str, defaults: dict) -> list:
+    """
+    读取 JSONL 批量任务文件
+    
+    每行一个 JSON 对象（字段同 BATCH_FIELDS，缺省字段使用命令行参数），
+    或直接为提示词字符串。
+    
+    Args:
+        batch_file: JSONL 文件路径
+        defaults: 各字段的默认值
+    
+    Returns:
+        generate() 的参数字典列表
+    """
+    jobs = []
+    with open(batch_file, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Error: Invalid JSON on line {line_no} of {batch_file}: {e}")
+                sys.exit(1)
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict) or not item.get("prompt"):
+                print(f"Error: Line {line_no} of {batch_file} has no prompt.")
+                sys.exit(1)
+            
+            job = dict(defaults)
+            job.update({key: value for key, value in item.items() if key in BATCH_FIELDS})
+            
+            # Validate up front so a bad line does not abort the batch midway
+            if job["aspect_ratio"] not in VALID_ASPECT_RATIOS:
+                print(f"Error: Invalid aspect ratio '{job['aspect_ratio']}' on line {line_no}. Valid options: {VALID_ASPECT_RATIOS}")
+                sys.exit(1)
+            if str(job["image_size"]).upper() not in VALID_IMAGE_SIZES:
+                print(f"Error: Invalid image size '{job['image_size']}' on line {line_no}. Valid options: {VALID_IMAGE_SIZES}")
+                sys.exit(1)
+            jobs.append(job)
+
+    # Resolve output names before any request is sent: prompts sharing the same
+    # 30-character prefix (or repeated filenames) would otherwise overwrite each other
+    used_paths = set()
+    for job in jobs:
+        base_name = build_output_name(job["prompt"], job["filename"])
+        output_dir = job["output_dir"] or ""
+        name, suffix = base_name, 1
+        path = os.path.join(output_dir, name)
+        while os.path.normcase(os.path.abspath(path)) in used_paths:
+            suffix += 1
+            name = f"{base_name}_{suffix}"
+            path = os.path.join(output_dir, name)
+        if suffix > 1:
+            print(f"Warning: Output name '{base_name}' is already used in the batch, saving as '{name}'.")
+        used_paths.add(os.path.normcase(os.path.abspath(path)))
+        job["filename"] = name
+    return jobs
+
+
+def generate_batch(jobs: list, concurrency: int = 4) -> list:
+    """
+    并发执行多个生成任务
+    
+    图片生成耗时主要在等待 API 响应，使用线程池同时发起多个请求，
+    总耗时约为 任务数 × 单次耗时 / 并发数（受 API 限流约束）。
+    
+    Args:
+        jobs: generate() 的参数字典列表
+        concurrency: 最大并发请求数
+    
+    Returns:
+        与 jobs 顺序一致的保存路径列表（失败为 None）
+    """
+    if not jobs:
+        return []
+    
+    if not os.environ.get("GEMINI_API_KEY"):
+        print("Error: API Key not found. Please set GEMINI_API_KEY environment variable.")
+        sys.exit(1)
+    
+    def run(index: int, job: dict):
+        # Tag every line with the job so concurrent output stays attributable
+        return generate(**job, log_prefix=f"[{index}/{len(jobs)} {job['filename']}] ")
+    
+    workers = max(1, min(concurrency, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, range(1, len(jobs) + 1), jobs))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate images using Gemini Nano Banana.")
-    parser.add_argument("prompt", nargs="?", default="Nano Banana", help="The text prompt for image generation.")
+    parser.add_argument("prompt", nargs="?", default=None, help="The text prompt for image generation. Default is 'Nano Banana'.")
     parser.add_argument(
         "--negative_prompt", "-n",
         default=None,
@@ -231,7 +432,41 @@ if __name__ == "__main__":
         default=None,
         help="Specific filename for the generated image (without extension). Overrides auto-naming."
     )
+    parser.add_argument(
+        "--batch", "-b",
+        default=None,
+        help="JSONL file with one job per line (fields: prompt, negative_prompt, aspect_ratio, image_size, output_dir, filename). Missing fields fall back to the options above."
+    )
+    parser.add_argument(
+        "--concurrency", "-c",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent requests in batch mode. Default is 4."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the API, bypassing the local image cache (NANO_BANANA_CACHE_DIR, default ~/.cache/nano-banana)."
+    )
 
     args = parser.parse_args()
     
-    generate(args.prompt, args.negative_prompt, args.aspect_ratio, args.image_size, args.output, args.filename)
+    if args.batch:
+        if args.prompt is not None or args.filename:
+            parser.error("prompt and --filename cannot be used with --batch; set them per line in the batch file")
+        defaults = {
+            "negative_prompt": args.negative_prompt,
+            "aspect_ratio": args.aspect_ratio,
+            "image_size": args.image_size,
+            "output_dir": args.output,
+            "filename": None,
+            "use_cache": not args.no_cache,
+        }
+        jobs = load_batch_file(args.batch, defaults)
+        results = generate_batch(jobs, args.concurrency)
+        succeeded = sum(1 for path in results if path)
+        print(f"Batch finished: {succeeded}/{len(jobs)} images generated.")
+        sys.exit(0 if succeeded == len(jobs) else 1)
+    
+    generate(args.prompt or "Nano Banana", args.negative_prompt, args.aspect_ratio, args.image_size, args.output, args.filename,
+             use_cache=not args.no_cache)
@@ -30,19 +30,16 @@ import re
 import zipfile
 import shutil
 import tempfile
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Iterator, Optional, Tuple, List
+from urllib.parse import unquote
 from xml.etree import ElementTree as ET
 
-# 检查 python-pptx 是否已安装
-try:
-    from pptx import Presentation
-    from pptx.util import Emu
-except ImportError:
-    print("错误: 缺少 python-pptx 库")
-    print("请运行: pip install python-pptx")
-    sys.exit(1)
-
 # 导入项目工具模块
 sys.path.insert(0, str(Path(__file__).parent))
 try:
@@ -66,21 +63,40 @@ except ImportError:
 
 # SVG 转 PNG 库检测（用于 Office 兼容模式）
 # 优先使用 CairoSVG（渲染质量更好），降级到 svglib
+# 首次需要时才导入（load_png_renderer），--help 或 --no-compat 时不加载
 PNG_RENDERER = None  # 'cairosvg' | 'svglib' | None
+PNG_RENDERER_VERSION = ''  # 渲染库版本，参与 PNG 缓存键
+_png_renderer_loaded = False
 
-try:
-    import cairosvg
-    PNG_RENDERER = 'cairosvg'
-except ImportError:
+
+def load_png_renderer() -> Optional[str]:
+    """按需导入 PNG 渲染库，返回渲染器名称（未安装返回 None）"""
+    global PNG_RENDERER, PNG_RENDERER_VERSION, _png_renderer_loaded, cairosvg, svg2rlg, renderPM
+    if _png_renderer_loaded:
+        return PNG_RENDERER
+    _png_renderer_loaded = True
+    
     try:
-        from svglib.svglib import svg2rlg
-        from reportlab.graphics import renderPM
-        PNG_RENDERER = 'svglib'
-    except ImportError:
-        pass
+        import cairosvg
+        PNG_RENDERER = 'cairosvg'
+        PNG_RENDERER_VERSION = getattr(cairosvg, '__version__', '')
+    except (ImportError, OSError):
+        # OSError: 已安装 cairosvg 但系统缺少 cairo 动态库
+        try:
+            import svglib
+            import reportlab
+            from svglib.svglib import svg2rlg
+            from reportlab.graphics import renderPM
+            PNG_RENDERER = 'svglib'
+            PNG_RENDERER_VERSION = f"{getattr(svglib, '__version__', '')}/{reportlab.Version}"
+        except ImportError:
+            pass
+    return PNG_RENDERER
+
 
 def get_png_renderer_info() -> tuple:
     """获取 PNG 渲染器信息"""
+    load_png_renderer()
     if PNG_RENDERER == 'cairosvg':
         return ('cairosvg', '(渐变/滤镜完整)', None)
     elif PNG_RENDERER == 'svglib':
@@ -89,6 +105,12 @@ def get_png_renderer_info() -> tuple:
         return (None, '(未安装)', '安装方法: pip install cairosvg 或 pip install svglib reportlab')
 
 
+# PNG 后备图片缓存目录（位于项目目录下）
+PNG_CACHE_DIR_NAME = '.png_cache'
+
+# PNG 缓存写盘线程数
+PNG_WRITER_THREADS = 4
+
 # EMU 转换常量
 EMU_PER_INCH = 914400
 EMU_PER_PIXEL = EMU_PER_INCH / 96
@@ -105,23 +127,30 @@ NAMESPACES = {
 for prefix, uri in NAMESPACES.items():
     ET.register_namespace(prefix, uri)
 
+# viewBox 解析（每个数值单独捕获，兼容空格/逗号分隔与单双引号）
+VIEWBOX_RE = re.compile(
+    r'viewBox=["\']\s*([-+]?[\d.]+)[\s,]+([-+]?[\d.]+)[\s,]+([-+]?[\d.]+)[\s,]+([-+]?[\d.]+)'
+)
+# 画布尺寸字符串解析，如 "1280×720"
+DIMENSIONS_RE = re.compile(r'(\d+)[×x](\d+)')
+# SVG 中的资源引用（href / xlink:href），用于 PNG 缓存键
+HREF_RE = re.compile(rb'href\s*=\s*["\']([^"\']*)["\']')
+# URL 协议前缀（如 http:、file:），两个字符以上以免误判 Windows 盘符
+URL_SCHEME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]+:')
+
+
+def parse_viewbox(content: str) -> Optional[Tuple[str, str, str, str]]:
+    """从 SVG 文本中提取 viewBox 的四个数值字符串（未找到返回 None）"""
+    # 先用子串查找快速排除不含 viewBox 的内容，再执行正则
+    if 'viewBox' not in content:
+        return None
+    match = VIEWBOX_RE.search(content)
+    return match.groups() if match else None
+
 
 def get_slide_dimensions(canvas_format: str, custom_pixels: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
     """获取幻灯片尺寸（EMU 单位）"""
-    if custom_pixels:
-        width_px, height_px = custom_pixels
-    else:
-        if canvas_format not in CANVAS_FORMATS:
-            canvas_format = 'ppt169'
-        
-        dimensions = CANVAS_FORMATS[canvas_format]['dimensions']
-        match = re.match(r'(\d+)[×x](\d+)', dimensions)
-        if match:
-            width_px = int(match.group(1))
-            height_px = int(match.group(2))
-        else:
-            width_px, height_px = 1280, 720
-    
+    width_px, height_px = get_pixel_dimensions(canvas_format, custom_pixels)
     return int(width_px * EMU_PER_PIXEL), int(height_px * EMU_PER_PIXEL)
 
 
@@ -134,101 +163,341 @@ def get_pixel_dimensions(canvas_format: str, custom_pixels: Optional[Tuple[int,
         canvas_format = 'ppt169'
     
     dimensions = CANVAS_FORMATS[canvas_format]['dimensions']
-    match = re.match(r'(\d+)[×x](\d+)', dimensions)
+    match = DIMENSIONS_RE.match(dimensions)
     if match:
         return int(match.group(1)), int(match.group(2))
     return 1280, 720
 
 
-def get_viewbox_dimensions(svg_path: Path) -> Optional[Tuple[int, int]]:
-    """从 SVG 的 viewBox 提取像素尺寸（返回整数）"""
+def read_svg_viewbox(svg_path: Path) -> Optional[Tuple[str, str, str, str]]:
+    """读取 SVG 文件头部并解析 viewBox"""
     try:
         with open(svg_path, 'r', encoding='utf-8') as f:
             content = f.read(2000)
-        
-        match = re.search(r'viewBox="([^"]+)"', content)
-        if not match:
-            return None
-        
-        parts = re.split(r'[\s,]+', match.group(1).strip())
-        if len(parts) < 4:
-            return None
-        
-        width = float(parts[2])
-        height = float(parts[3])
-        if width <= 0 or height <= 0:
-            return None
-        
-        return int(round(width)), int(round(height))
+        return parse_viewbox(content)
     except Exception:
         return None
 
 
-def detect_format_from_svg(svg_path: Path) -> Optional[str]:
-    """从 SVG 文件的 viewBox 检测画布格式"""
+def viewbox_to_dimensions(viewbox: Optional[Tuple[str, str, str, str]]) -> Optional[Tuple[int, int]]:
+    """将 viewBox 数值转换为像素尺寸（返回整数）"""
+    if viewbox is None:
+        return None
+    
     try:
-        with open(svg_path, 'r', encoding='utf-8') as f:
-            content = f.read(2000)
-        
-        match = re.search(r'viewBox="([^"]+)"', content)
-        if match:
-            viewbox = match.group(1)
-            for fmt_key, fmt_info in CANVAS_FORMATS.items():
-                if fmt_info['viewbox'] == viewbox:
-                    return fmt_key
-    except Exception:
-        pass
+        width = float(viewbox[2])
+        height = float(viewbox[3])
+    except ValueError:
+        return None
+    if width <= 0 or height <= 0:
+        return None
+    
+    return int(round(width)), int(round(height))
+
+
+def viewbox_to_format(viewbox: Optional[Tuple[str, str, str, str]]) -> Optional[str]:
+    """根据 viewBox 数值匹配画布格式"""
+    if viewbox is None:
+        return None
+    
+    viewbox_str = ' '.join(viewbox)
+    for fmt_key, fmt_info in CANVAS_FORMATS.items():
+        if fmt_info['viewbox'] == viewbox_str:
+            return fmt_key
     return None
 
 
-def convert_svg_to_png(svg_path: Path, png_path: Path, width: int = None, height: int = None) -> bool:
+def read_svg_bytes(svg_path: Path) -> Optional[bytes]:
+    """读取 SVG 文件原始内容（读取失败返回 None）"""
+    try:
+        return svg_path.read_bytes()
+    except OSError:
+        return None
+
+
+def render_svg_to_png_bytes(
+    svg_path: Path,
+    width: int = None,
+    height: int = None,
+    svg_data: Optional[bytes] = None
+) -> Optional[bytes]:
     """
-    将 SVG 转换为 PNG
+    将 SVG 渲染为 PNG 数据（不写入磁盘）
     
     Args:
         svg_path: SVG 文件路径
-        png_path: 输出 PNG 文件路径
         width: 输出宽度（像素）
         height: 输出高度（像素）
+        svg_data: 已读取的 SVG 内容（可选，避免重复读取文件）
     
     Returns:
-        是否成功转换
+        PNG 二进制数据，失败返回 None
     """
-    if PNG_RENDERER is None:
-        return False
+    if load_png_renderer() is None:
+        return None
     
     try:
         if PNG_RENDERER == 'cairosvg':
             # 使用 CairoSVG（渲染质量更好）
-            cairosvg.svg2png(
+            # 传入已读取的内容时，url 仅用于解析相对路径的图片引用
+            return cairosvg.svg2png(
+                bytestring=svg_data,
                 url=str(svg_path),
-                write_to=str(png_path),
                 output_width=width,
                 output_height=height
             )
-            return True
         
         elif PNG_RENDERER == 'svglib':
             # 使用 svglib（轻量级，但渐变支持有限）
+            # svglib 需要文件路径来解析相对图片引用，因此不使用 svg_data
             drawing = svg2rlg(str(svg_path))
             if drawing is None:
                 print(f"  警告: 无法解析 SVG ({svg_path.name})")
-                return False
+                return None
+            
+            # svglib 按 pt 计算尺寸（1px = 0.75pt），直接渲染只有目标分辨率的 3/4；
+            # 缩放矢量图形本身而不是输出位图，线宽等随之缩放
+            if width and height and drawing.width and drawing.height:
+                drawing.scale(width / drawing.width, height / drawing.height)
+                drawing.width, drawing.height = width, height
             
             # 渲染为 PNG
-            renderPM.drawToFile(
+            return renderPM.drawToString(
                 drawing,
-                str(png_path),
                 fmt="PNG",
                 configPIL={'quality': 95}
             )
-            return True
         
     except Exception as e:
         print(f"  警告: SVG 转 PNG 失败 ({svg_path.name}): {e}")
-        return False
+        return None
     
-    return False
+    return None
+
+
+def get_png_cache_key(svg_path: Path, svg_data: bytes, width: int, height: int) -> Optional[str]:
+    """
+    计算 PNG 缓存键
+    
+    由 SVG 内容、输出尺寸、渲染器及其版本，以及 SVG 引用的本地文件（路径、修改时间、大小）
+    共同决定；任一变化都会得到新的键。引用远程资源时无法判断是否变化，返回 None 表示不缓存。
+    
+    Args:
+        svg_path: SVG 文件路径（用于解析相对引用）
+        svg_data: SVG 文件内容
+        width: 输出宽度（像素）
+        height: 输出高度（像素）
+    
+    Returns:
+        十六进制缓存键，不可缓存时返回 None
+    """
+    digest = hashlib.sha256(svg_data)
+    digest.update(f'\0{width}x{height}\0{PNG_RENDERER}\0{PNG_RENDERER_VERSION}'.encode('utf-8'))
+    
+    for match in HREF_RE.finditer(svg_data):
+        href = match.group(1).decode('utf-8', 'replace').strip()
+        if not href or href.startswith(('#', 'data:')):
+            continue
+        if href.startswith('file://'):
+            linked = Path(unquote(href[len('file://'):]))
+        elif URL_SCHEME_RE.match(href):
+            return None
+        else:
+            linked = svg_path.parent / unquote(href)
+        
+        try:
+            stat = linked.stat()
+            linked_state = f'{stat.st_mtime_ns}:{stat.st_size}'
+        except OSError:
+            linked_state = 'missing'
+        digest.update(f'\0{href}\0{linked_state}'.encode('utf-8'))
+    
+    return digest.hexdigest()
+
+
+def write_png_cache(png_data: bytes, cached_png: Path) -> None:
+    """写入 PNG 缓存（先写临时文件再原子替换，中断不会留下残缺缓存；写入失败不影响转换结果）"""
+    tmp_path = None
+    try:
+        cached_png.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cached_png.parent, suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            f.write(png_data)
+        os.replace(tmp_path, cached_png)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def prune_png_cache(cache_dir: Path, keep_keys: set) -> int:
+    """
+    删除本次转换未使用的 PNG 缓存（含中断写入遗留的临时文件）
+    
+    缓存按内容寻址，每次修改幻灯片都会产生新条目；只保留本次用到的条目，
+    避免项目下的 .png_cache 无限增长。
+    
+    Returns:
+        删除的文件数
+    """
+    removed = 0
+    try:
+        with os.scandir(cache_dir) as entries:
+            stale = [
+                entry.path for entry in entries
+                if entry.is_file() and (
+                    entry.name.endswith('.tmp')
+                    or (entry.name.endswith('.png') and entry.name[:-4] not in keep_keys)
+                )
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+    
+    for path in stale:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def create_render_process_pool(workers: int) -> ProcessPoolExecutor:
+    """创建 PNG 渲染进程池（spawn 启动，每个进程独立加载渲染库；进程按需启动，全部命中缓存时不会创建）"""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+def iter_png_fallbacks(
+    svg_files: List[Path],
+    width: int = None,
+    height: int = None,
+    concurrency: int = 1,
+    svg_contents: Optional[List[Optional[bytes]]] = None,
+    cache_dir: Optional[Path] = None,
+    force: bool = False,
+    jobs: int = 1
+) -> Iterator[Tuple[Optional[bytes], bool, Optional[str]]]:
+    """
+    按顺序逐张生成 PNG 后备图片数据
+    
+    Args:
+        svg_files: SVG 文件列表
+        width: 输出宽度（像素）
+        height: 输出高度（像素）
+        concurrency: 并发渲染线程数（1 为顺序渲染）
+        svg_contents: 已读取的 SVG 内容列表（可选，与 svg_files 顺序一致）
+        cache_dir: PNG 缓存目录（可选，SVG 及其引用文件未修改时直接复用上次渲染结果）
+        force: 忽略缓存，强制重新渲染
+        jobs: 渲染进程数（>1 时由独立进程渲染，不受 GIL 限制，svglib 也可并行）
+    
+    Yields:
+        与 svg_files 顺序一致的 (PNG 数据（失败为 None）, 是否命中缓存, 缓存键（不缓存为 None）)
+    
+    每张渲染完成即产出，调用方可以边渲染边处理幻灯片，无需等待整批完成。
+    PNG 数据保留在内存中，由调用方直接写入 PPTX 压缩包，不经过临时目录；
+    只有缓存更新需要落盘，交给后台写入线程，不阻塞下一张的渲染。
+    """
+    # 在启动渲染线程前完成导入
+    load_png_renderer()
+    
+    # 多进程模式：当前使用的进程池位于列表末尾，工作进程崩溃导致进程池损坏时追加新池
+    process_pools = [create_render_process_pool(jobs)] if jobs > 1 else []
+    pool_lock = threading.Lock()
+    
+    def render_in_process(svg_path: Path, svg_data: bytes) -> Optional[bytes]:
+        with pool_lock:
+            pool = process_pools[-1]
+        task = (render_svg_to_png_bytes, svg_path, width, height, svg_data)
+        try:
+            return pool.submit(*task).result()
+        except BrokenProcessPool:
+            # 后续幻灯片改用新的进程池
+            with pool_lock:
+                if process_pools[-1] is pool:
+                    process_pools.append(create_render_process_pool(jobs))
+        # 同一进程池中的其他幻灯片只是被拖累，单独在新进程中重试；
+        # 引发崩溃的幻灯片再次失败时只影响它自己
+        with create_render_process_pool(1) as isolated:
+            return isolated.submit(*task).result()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=PNG_WRITER_THREADS) as writer:
+            def render(index: int) -> Tuple[Optional[bytes], bool, Optional[str]]:
+                svg_path = svg_files[index]
+                svg_data = svg_contents[index] if svg_contents else read_svg_bytes(svg_path)
+                if svg_data is None:
+                    return None, False, None
+                
+                # 缓存按内容寻址：同名文件、不同目录互不干扰，引用图片或渲染器变化时自动失效
+                cached_png = None
+                cache_key = None
+                if cache_dir is not None:
+                    cache_key = get_png_cache_key(svg_path, svg_data, width, height)
+                    if cache_key is not None:
+                        cached_png = cache_dir / f'{cache_key}.png'
+                        if not force:
+                            try:
+                                return cached_png.read_bytes(), True, cache_key
+                            except OSError:
+                                pass
+                
+                if process_pools:
+                    # 工作进程崩溃（段错误/内存不足）时只让该页降级为纯 SVG，不中断整个导出
+                    try:
+                        png_data = render_in_process(svg_path, svg_data)
+                    except Exception as e:
+                        print(f"  警告: SVG 转 PNG 失败 ({svg_path.name}): {e}")
+                        return None, False, cache_key
+                else:
+                    png_data = render_svg_to_png_bytes(svg_path, width=width, height=height, svg_data=svg_data)
+                if png_data is not None and cached_png is not None:
+                    writer.submit(write_png_cache, png_data, cached_png)
+                return png_data, False, cache_key
+            
+            # svglib/reportlab 的 renderPM 依赖全局状态，仅 CairoSVG 支持多线程渲染；
+            # 多进程模式下线程只负责缓存检查与分发，每个进程一个分发线程
+            if process_pools:
+                workers = min(jobs, len(svg_files))
+            elif PNG_RENDERER == 'cairosvg':
+                workers = min(concurrency, len(svg_files))
+            else:
+                workers = 1
+            if workers <= 1:
+                for index in range(len(svg_files)):
+                    yield render(index)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    yield from executor.map(render, range(len(svg_files)))
+    finally:
+        for pool in process_pools:
+            pool.shutdown()
+
+
+def list_svg_files(svg_dir: Path) -> List[Path]:
+    """列出目录下的 SVG 文件（不递归，按文件名排序）"""
+    # os.scandir 直接返回目录项类型，无需为每个条目额外 stat
+    with os.scandir(svg_dir) as entries:
+        return sorted(
+            Path(entry.path) for entry in entries
+            if entry.name.endswith('.svg') and entry.is_file()
+        )
+
+
+def iter_files(root_dir: Path):
+    """迭代遍历目录下的所有文件，返回 (文件路径, 相对路径)"""
+    stack = [str(root_dir)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    yield entry.path, os.path.relpath(entry.path, root_dir)
 
 
 def find_svg_files(project_path: Path, source: str = 'output') -> Tuple[List[Path], str]:
@@ -253,22 +522,23 @@ def find_svg_files(project_path: Path, source: str = 'output') -> Tuple[List[Pat
     
     # 获取目录名（支持预定义别名或直接指定目录名）
     dir_name = dir_map.get(source, source)
-    svg_dir = project_path / dir_name
     
-    if not svg_dir.exists():
+    # 直接尝试列目录，不存在时再降级（省去先 exists() 再 scandir 的重复 stat）
+    try:
+        return list_svg_files(project_path / dir_name), dir_name
+    except (FileNotFoundError, NotADirectoryError):
         print(f"  警告: {dir_name} 目录不存在，尝试 svg_output")
-        dir_name = 'svg_output'
-        svg_dir = project_path / dir_name
-    
-    if not svg_dir.exists():
-        # 直接在指定目录查找
-        if project_path.is_dir():
-            svg_dir = project_path
-            dir_name = project_path.name
-        else:
-            return [], ''
     
-    return sorted(svg_dir.glob('*.svg')), dir_name
+    try:
+        return list_svg_files(project_path / 'svg_output'), 'svg_output'
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    
+    # 直接在指定目录查找
+    try:
+        return list_svg_files(project_path), project_path.name
+    except (FileNotFoundError, NotADirectoryError):
+        return [], ''
 
 
 def find_notes_files(project_path: Path, svg_files: List[Path] = None) -> dict:
@@ -289,7 +559,10 @@ def find_notes_files(project_path: Path, svg_files: List[Path] = None) -> dict:
     notes_dir = project_path / 'notes'
     notes = {}
     
-    if not notes_dir.exists():
+    try:
+        with os.scandir(notes_dir) as entries:
+            notes_files = [Path(entry.path) for entry in entries if entry.name.endswith('.md')]
+    except (FileNotFoundError, NotADirectoryError):
         return notes
     
     svg_stems_mapping = {}
@@ -300,7 +573,7 @@ def find_notes_files(project_path: Path, svg_files: List[Path] = None) -> dict:
             svg_index_mapping[i] = svg_path.stem
 
     # 收集所有 notes 文件信息
-    for notes_file in notes_dir.glob('*.md'):
+    for notes_file in notes_files:
         try:
             with open(notes_file, 'r', encoding='utf-8') as f:
                 content = f.read().strip()
@@ -379,36 +652,18 @@ def markdown_to_plain_text(md_content: str) -> str:
     return '\n'.join(result).strip()
 
 
-def create_notes_slide_xml(slide_num: int, notes_text: str) -> str:
-    """
-    创建备注幻灯片 XML
-    
-    Args:
-        slide_num: 幻灯片序号
-        notes_text: 备注文本（纯文本格式）
-    
-    Returns:
-        备注幻灯片 XML 字符串
-    """
-    # 转义 XML 特殊字符
-    notes_text = notes_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-    
-    # 将换行转换为 <a:p> 段落
-    paragraphs = []
-    for para in notes_text.split('\n'):
-        if para.strip():
-            paragraphs.append(f'''<a:p>
+# PPTX XML 模板（模块级常量，使用 str.format 填充，字面量花括号写作 {{ }}）
+
+# 备注段落
+NOTES_PARAGRAPH_TEMPLATE = '''<a:p>
               <a:r>
                 <a:rPr lang="zh-CN" dirty="0"/>
                 <a:t>{para}</a:t>
               </a:r>
-            </a:p>''')
-        else:
-            paragraphs.append('<a:p><a:endParaRPr lang="zh-CN" dirty="0"/></a:p>')
-    
-    paragraphs_xml = '\n            '.join(paragraphs) if paragraphs else '<a:p><a:endParaRPr lang="zh-CN" dirty="0"/></a:p>'
-    
-    return f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+            </a:p>'''
+
+# 备注幻灯片
+NOTES_SLIDE_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <p:notes xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"
          xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"
          xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">
@@ -463,72 +718,15 @@ def create_notes_slide_xml(slide_num: int, notes_text: str) -> str:
   </p:clrMapOvr>
 </p:notes>'''
 
-
-def create_notes_slide_rels_xml(slide_num: int) -> str:
-    """
-    创建备注幻灯片关系文件 XML
-    
-    Args:
-        slide_num: 幻灯片序号
-    
-    Returns:
-        关系文件 XML 字符串
-    """
-    return f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+# 备注幻灯片关系文件
+NOTES_SLIDE_RELS_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
   <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesMaster" Target="../notesMasters/notesMaster1.xml"/>
   <Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide" Target="../slides/slide{slide_num}.xml"/>
 </Relationships>'''
 
-
-def create_slide_xml_with_svg(
-    slide_num: int, 
-    png_rid: str,
-    svg_rid: str, 
-    width_emu: int, 
-    height_emu: int,
-    transition: Optional[str] = None,
-    transition_duration: float = 0.5,
-    auto_advance: Optional[float] = None,
-    use_compat_mode: bool = True
-) -> str:
-    """
-    创建包含 SVG 图片的幻灯片 XML
-    
-    Args:
-        slide_num: 幻灯片序号
-        png_rid: PNG 后备图片关系 ID
-        svg_rid: SVG 关系 ID
-        width_emu: 宽度（EMU）
-        height_emu: 高度（EMU）
-        transition: 切换效果名称
-        transition_duration: 切换持续时间（秒）
-        auto_advance: 自动翻页间隔（秒）
-        use_compat_mode: 是否使用兼容模式（PNG + SVG 双格式）
-    """
-    # 生成切换效果 XML
-    transition_xml = ''
-    if transition and ANIMATIONS_AVAILABLE:
-        transition_xml = '\n' + create_transition_xml(
-            effect=transition,
-            duration=transition_duration,
-            advance_after=auto_advance
-        )
-    
-    # 兼容模式：PNG 主图片 + SVG 扩展（Office 官方推荐）
-    if use_compat_mode:
-        blip_xml = f'''<a:blip r:embed="{png_rid}">
-            <a:extLst>
-              <a:ext uri="{{96DAC541-7B7A-43D3-8B79-37D633B846F1}}">
-                <asvg:svgBlip xmlns:asvg="http://schemas.microsoft.com/office/drawing/2016/SVG/main" r:embed="{svg_rid}"/>
-              </a:ext>
-            </a:extLst>
-          </a:blip>'''
-    else:
-        # 纯 SVG 模式（仅新版 Office 支持）
-        blip_xml = f'<a:blip r:embed="{svg_rid}"/>'
-    
-    return f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+# 幻灯片
+SLIDE_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"
        xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"
        xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">
@@ -578,6 +776,123 @@ def create_slide_xml_with_svg(
   </p:clrMapOvr>{transition_xml}
 </p:sld>'''
 
+# 兼容模式图片引用：PNG 主图片 + SVG 扩展（Office 官方推荐）
+COMPAT_BLIP_TEMPLATE = '''<a:blip r:embed="{png_rid}">
+            <a:extLst>
+              <a:ext uri="{{96DAC541-7B7A-43D3-8B79-37D633B846F1}}">
+                <asvg:svgBlip xmlns:asvg="http://schemas.microsoft.com/office/drawing/2016/SVG/main" r:embed="{svg_rid}"/>
+              </a:ext>
+            </a:extLst>
+          </a:blip>'''
+
+# 纯 SVG 图片引用（仅新版 Office 支持）
+SVG_BLIP_TEMPLATE = '<a:blip r:embed="{svg_rid}"/>'
+
+# 幻灯片关系文件（兼容模式）
+SLIDE_RELS_COMPAT_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout" Target="../slideLayouts/slideLayout1.xml"/>
+  <Relationship Id="{png_rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="../media/{png_filename}"/>
+  <Relationship Id="{svg_rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="../media/{svg_filename}"/>
+</Relationships>'''
+
+# 幻灯片关系文件（纯 SVG 模式）
+SLIDE_RELS_SVG_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout" Target="../slideLayouts/slideLayout1.xml"/>
+  <Relationship Id="{svg_rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="../media/{svg_filename}"/>
+</Relationships>'''
+
+
+def create_notes_slide_xml(slide_num: int, notes_text: str) -> str:
+    """
+    创建备注幻灯片 XML
+    
+    Args:
+        slide_num: 幻灯片序号
+        notes_text: 备注文本（纯文本格式）
+    
+    Returns:
+        备注幻灯片 XML 字符串
+    """
+    # 转义 XML 特殊字符
+    notes_text = notes_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    
+    # 将换行转换为 <a:p> 段落
+    paragraphs = []
+    for para in notes_text.split('\n'):
+        if para.strip():
+            paragraphs.append(NOTES_PARAGRAPH_TEMPLATE.format(para=para))
+        else:
+            paragraphs.append('<a:p><a:endParaRPr lang="zh-CN" dirty="0"/></a:p>')
+    
+    paragraphs_xml = '\n            '.join(paragraphs) if paragraphs else '<a:p><a:endParaRPr lang="zh-CN" dirty="0"/></a:p>'
+    
+    return NOTES_SLIDE_TEMPLATE.format(paragraphs_xml=paragraphs_xml)
+
+
+def create_notes_slide_rels_xml(slide_num: int) -> str:
+    """
+    创建备注幻灯片关系文件 XML
+    
+    Args:
+        slide_num: 幻灯片序号
+    
+    Returns:
+        关系文件 XML 字符串
+    """
+    return NOTES_SLIDE_RELS_TEMPLATE.format(slide_num=slide_num)
+
+
+def create_slide_xml_with_svg(
+    slide_num: int, 
+    png_rid: str,
+    svg_rid: str, 
+    width_emu: int, 
+    height_emu: int,
+    transition: Optional[str] = None,
+    transition_duration: float = 0.5,
+    auto_advance: Optional[float] = None,
+    use_compat_mode: bool = True
+) -> str:
+    """
+    创建包含 SVG 图片的幻灯片 XML
+    
+    Args:
+        slide_num: 幻灯片序号
+        png_rid: PNG 后备图片关系 ID
+        svg_rid: SVG 关系 ID
+        width_emu: 宽度（EMU）
+        height_emu: 高度（EMU）
+        transition: 切换效果名称
+        transition_duration: 切换持续时间（秒）
+        auto_advance: 自动翻页间隔（秒）
+        use_compat_mode: 是否使用兼容模式（PNG + SVG 双格式）
+    """
+    # 生成切换效果 XML
+    transition_xml = ''
+    if transition and ANIMATIONS_AVAILABLE:
+        transition_xml = '\n' + create_transition_xml(
+            effect=transition,
+            duration=transition_duration,
+            advance_after=auto_advance
+        )
+    
+    # 兼容模式：PNG 主图片 + SVG 扩展（Office 官方推荐）
+    if use_compat_mode:
+        blip_xml = COMPAT_BLIP_TEMPLATE.format(png_rid=png_rid, svg_rid=svg_rid)
+    else:
+        # 纯 SVG 模式（仅新版 Office 支持）
+        blip_xml = SVG_BLIP_TEMPLATE.format(svg_rid=svg_rid)
+    
+    return SLIDE_TEMPLATE.format(
+        slide_num=slide_num,
+        blip_xml=blip_xml,
+        width_emu=width_emu,
+        height_emu=height_emu,
+        transition_xml=transition_xml
+    )
+
 
 def create_slide_rels_xml(png_rid: str, png_filename: str, svg_rid: str, svg_filename: str, use_compat_mode: bool = True) -> str:
     """
@@ -591,18 +906,14 @@ def create_slide_rels_xml(png_rid: str, png_filename: str, svg_rid: str, svg_fil
         use_compat_mode: 是否使用兼容模式
     """
     if use_compat_mode:
-        return f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout" Target="../slideLayouts/slideLayout1.xml"/>
-  <Relationship Id="{png_rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="../media/{png_filename}"/>
-  <Relationship Id="{svg_rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="../media/{svg_filename}"/>
-</Relationships>'''
+        return SLIDE_RELS_COMPAT_TEMPLATE.format(
+            png_rid=png_rid,
+            png_filename=png_filename,
+            svg_rid=svg_rid,
+            svg_filename=svg_filename
+        )
     else:
-        return f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout" Target="../slideLayouts/slideLayout1.xml"/>
-  <Relationship Id="{svg_rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="../media/{svg_filename}"/>
-</Relationships>'''
+        return SLIDE_RELS_SVG_TEMPLATE.format(svg_rid=svg_rid, svg_filename=svg_filename)
 
 
 def create_pptx_with_native_svg(
@@ -615,7 +926,11 @@ def create_pptx_with_native_svg(
     auto_advance: Optional[float] = None,
     use_compat_mode: bool = True,
     notes: Optional[dict] = None,
-    enable_notes: bool = True
+    enable_notes: bool = True,
+    concurrency: int = 1,
+    png_cache_dir: Optional[Path] = None,
+    force: bool = False,
+    jobs: int = 1
 ) -> bool:
     """
     创建包含原生 SVG 的 PPTX 文件
@@ -631,29 +946,44 @@ def create_pptx_with_native_svg(
         use_compat_mode: 使用 Office 兼容模式（PNG + SVG 双格式，默认开启）
         notes: 备注字典，key 为幻灯片编号，value 为备注内容
         enable_notes: 是否启用备注嵌入（默认开启）
+        concurrency: PNG 后备图片的并发渲染线程数（默认 1）
+        png_cache_dir: PNG 后备图片缓存目录（默认不缓存）
+        force: 忽略 PNG 缓存，强制重新渲染
+        jobs: PNG 后备图片的渲染进程数（默认 1，>1 时使用多进程渲染）
     """
     if not svg_files:
         print("错误: 没有找到 SVG 文件")
         return False
     
-    # 检查兼容模式依赖
-    renderer_name, renderer_status, renderer_hint = get_png_renderer_info()
+    # 检查 python-pptx 是否已安装（按需导入，--help 等场景无需加载）
+    try:
+        from pptx import Presentation
+    except ImportError:
+        print("错误: 缺少 python-pptx 库")
+        print("请运行: pip install python-pptx")
+        sys.exit(1)
+    
+    # 检查兼容模式依赖（仅兼容模式需要导入 PNG 渲染库）
+    renderer_name, renderer_status, renderer_hint = (
+        get_png_renderer_info() if use_compat_mode else (None, '', None)
+    )
     if use_compat_mode and PNG_RENDERER is None:
         print("警告: 未安装 PNG 渲染库，无法使用兼容模式")
         print(f"  {renderer_hint}")
         print("  将使用纯 SVG 模式（可能在 Office LTSC 2021 等版本中不显示）")
         use_compat_mode = False
     
-    # 自动检测画布格式或从 viewBox 获取尺寸
+    # 自动检测画布格式或从 viewBox 获取尺寸（整批只解析一次首个 SVG 的 viewBox）
     custom_pixels: Optional[Tuple[int, int]] = None
+    first_viewbox = read_svg_viewbox(svg_files[0]) if canvas_format is None else None
     if canvas_format is None:
-        canvas_format = detect_format_from_svg(svg_files[0])
+        canvas_format = viewbox_to_format(first_viewbox)
         if canvas_format and verbose:
             format_name = CANVAS_FORMATS.get(canvas_format, {}).get('name', canvas_format)
             print(f"  检测到画布格式: {format_name}")
     
     if canvas_format is None:
-        custom_pixels = get_viewbox_dimensions(svg_files[0])
+        custom_pixels = viewbox_to_dimensions(first_viewbox)
         if custom_pixels and verbose:
             print(f"  使用 SVG viewBox 尺寸: {custom_pixels[0]} x {custom_pixels[1]} px")
     
@@ -662,8 +992,8 @@ def create_pptx_with_native_svg(
         if verbose:
             print(f"  使用默认格式: PPT 16:9")
     
-    width_emu, height_emu = get_slide_dimensions(canvas_format or 'ppt169', custom_pixels)
     pixel_width, pixel_height = get_pixel_dimensions(canvas_format or 'ppt169', custom_pixels)
+    width_emu, height_emu = get_slide_dimensions(canvas_format or 'ppt169', custom_pixels)
     
     if verbose:
         print(f"  幻灯片尺寸: {pixel_width} x {pixel_height} px")
@@ -671,6 +1001,10 @@ def create_pptx_with_native_svg(
         if use_compat_mode:
             print(f"  兼容模式: 开启 (PNG + SVG 双格式)")
             print(f"  PNG 渲染: {renderer_name} {renderer_status}")
+            if jobs > 1:
+                print(f"  并发渲染: {jobs} 进程")
+            elif concurrency > 1 and PNG_RENDERER == 'cairosvg':
+                print(f"  并发渲染: {concurrency} 线程")
         else:
             print(f"  兼容模式: 关闭 (纯 SVG)")
         if transition:
@@ -707,9 +1041,25 @@ def create_pptx_with_native_svg(
         with zipfile.ZipFile(base_pptx, 'r') as zf:
             zf.extractall(extract_dir)
         
-        # 创建 media 目录
-        media_dir = extract_dir / 'ppt' / 'media'
-        media_dir.mkdir(exist_ok=True)
+        # 每个 SVG 只读取一次，PNG 渲染与打包共用同一份内容（不再落盘到解压目录）
+        svg_contents = [read_svg_bytes(svg_path) for svg_path in svg_files]
+        
+        # 兼容模式：PNG 后备图片按顺序流式产出，幻灯片处理与后续渲染重叠进行
+        png_outcomes = None
+        if use_compat_mode:
+            png_outcomes = iter_png_fallbacks(
+                svg_files,
+                width=pixel_width,
+                height=pixel_height,
+                concurrency=concurrency,
+                svg_contents=svg_contents,
+                cache_dir=png_cache_dir,
+                force=force,
+                jobs=jobs
+            )
+        png_results = []
+        cached_count = 0
+        used_cache_keys = set()
         
         # 处理每个 SVG 文件
         success_count = 0
@@ -722,21 +1072,22 @@ def create_pptx_with_native_svg(
             png_rid = 'rId2'
             svg_rid = 'rId3' if use_compat_mode else 'rId2'
             
+            if png_outcomes is not None:
+                png_data, cached, cache_key = next(png_outcomes)
+                png_results.append(png_data)
+                cached_count += cached
+                if cache_key is not None:
+                    used_cache_keys.add(cache_key)
+            
             try:
-                # 复制 SVG 到 media 目录
-                shutil.copy(svg_path, media_dir / svg_filename)
+                # SVG 内容在打包时从内存写入 media
+                if svg_contents[i - 1] is None:
+                    raise OSError(f"无法读取文件: {svg_path}")
                 
-                # 兼容模式：生成 PNG 后备图片
+                # 兼容模式：使用已生成的 PNG 后备图片
                 slide_has_png = False
                 if use_compat_mode:
-                    png_path = media_dir / png_filename
-                    png_success = convert_svg_to_png(
-                        svg_path, 
-                        png_path,
-                        width=pixel_width,
-                        height=pixel_height
-                    )
-                    if png_success:
+                    if png_results[i - 1] is not None:
                         slide_has_png = True
                         any_png_generated = True
                     else:
@@ -824,6 +1175,19 @@ def create_pptx_with_native_svg(
                 if verbose:
                     print(f"  [{i}/{len(svg_files)}] {svg_path.name} - 错误: {e}")
         
+        # 所有结果已取出，立即关闭生成器：关闭渲染线程/进程池，并等待缓存写入完成
+        if png_outcomes is not None:
+            png_outcomes.close()
+        
+        if verbose and cached_count:
+            print(f"  PNG 缓存: {cached_count} 张未修改，跳过渲染")
+        
+        # 清理本次未用到的旧缓存（写入线程已随生成器关闭而结束）
+        if png_outcomes is not None and png_cache_dir is not None:
+            pruned_count = prune_png_cache(png_cache_dir, used_cache_keys)
+            if verbose and pruned_count:
+                print(f"  PNG 缓存: 已清理 {pruned_count} 个过期文件")
+        
         # 更新 [Content_Types].xml 添加 SVG 和 PNG 类型
         content_types_path = extract_dir / '[Content_Types].xml'
         with open(content_types_path, 'r', encoding='utf-8') as f:
@@ -855,10 +1219,18 @@ def create_pptx_with_native_svg(
         
         # 重新打包 PPTX
         with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file_path in extract_dir.rglob('*'):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(extract_dir)
-                    zf.write(file_path, arcname)
+            for file_path, arcname in iter_files(extract_dir):
+                zf.write(file_path, arcname)
+            
+            # SVG 直接从内存写入压缩包，省去临时文件的写入与回读
+            for i, svg_data in enumerate(svg_contents, 1):
+                if svg_data is not None:
+                    zf.writestr(f'ppt/media/image{i}.svg', svg_data)
+            
+            # PNG 后备图片直接从内存写入压缩包（PNG 已压缩，使用 STORED 避免重复压缩）
+            for i, png_data in enumerate(png_results, 1):
+                if png_data is not None:
+                    zf.writestr(f'ppt/media/image{i}.png', png_data, compress_type=zipfile.ZIP_STORED)
         
         if verbose:
             print()
@@ -870,6 +1242,11 @@ def create_pptx_with_native_svg(
                 if PNG_RENDERER == 'svglib' and renderer_hint:
                     print(f"  [提示] {renderer_hint}")
         
+        # 缺少 PNG 后备图片的幻灯片在旧版 Office 中无法显示，结束时汇总提醒
+        missing_png = [svg_files[i].name for i, png_data in enumerate(png_results) if png_data is None]
+        if missing_png:
+            print(f"  警告: {len(missing_png)} 张幻灯片未生成 PNG 后备图片，旧版 Office 中将无法显示: {', '.join(missing_png)}")
+        
         return success_count == len(svg_files)
         
     finally:
@@ -909,6 +1286,10 @@ SVG 来源目录 (-s):
     - 新版 Office 仍显示 SVG（可编辑），旧版显示 PNG
     - 需要安装 svglib: pip install svglib reportlab
     - 使用 --no-compat 可禁用（仅 Office 2019+ 支持）
+    - PNG 缓存于项目 .png_cache/ 目录，SVG 及其引用的图片未修改时直接复用
+    - 每次转换后自动删除本次未用到的缓存（切换 -s 来源目录时需重新渲染）
+    - 使用 --force 可忽略缓存强制重新渲染
+    - 使用 --jobs N 以 N 个进程并行渲染 PNG（绕过 GIL，svglib 也可并行）
 
 演讲备注 (默认开启):
     - 自动读取 notes/ 目录中的 Markdown 备注文件
@@ -929,6 +1310,12 @@ SVG 来源目录 (-s):
     # 兼容模式参数
     parser.add_argument('--no-compat', action='store_true',
                         help='禁用 Office 兼容模式（仅使用纯 SVG，需要 Office 2019+）')
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1,
+                        help='PNG 后备图片并发渲染线程数 (默认: CPU 核数，1 为顺序渲染)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='PNG 后备图片渲染进程数 (默认: 1，>1 时使用多进程，svglib 也可并行)')
+    parser.add_argument('--force', action='store_true',
+                        help='忽略 PNG 缓存（项目 .png_cache/ 目录），强制重新渲染所有后备图片')
     
     # 切换效果参数
     parser.add_argument('-t', '--transition', type=str, choices=transition_choices, default=None,
@@ -1003,7 +1390,11 @@ SVG 来源目录 (-s):
         auto_advance=args.auto_advance,
         use_compat_mode=not args.no_compat,
         notes=notes,
-        enable_notes=enable_notes
+        enable_notes=enable_notes,
+        concurrency=max(1, args.concurrency),
+        png_cache_dir=project_path / PNG_CACHE_DIR_NAME,
+        force=args.force,
+        jobs=max(1, args.jobs)
     )
     
     sys.exit(0 if success else 1)